@@ -7,4 +7,46 @@ PROCESS_PATH = "dummy_process"
 DB_CONNECTION_NAME = "medforce-pilot-backend:europe-west1:nhs-pilot"
 DB_USER = "postgres"
 DB_PASSWORD = "u]R6UT>afvkI7.J#"
-DB_NAME = "postgres"
\ No newline at end of file
+DB_NAME = "postgres"
+
+# Ingestion queue
+INGEST_WORKERS = 4
+INGEST_QUEUE_SIZE = 100
+INGEST_JOB_HISTORY = 1000
+INGEST_SYNC_DEBOUNCE_SECONDS = 10  # quiet period before pushing the vector DB to GCS
+INGEST_SYNC_MAX_DELAY_SECONDS = 60  # push anyway if uploads never go quiet
+INGEST_SHUTDOWN_TIMEOUT_SECONDS = 8  # wait for running jobs on shutdown; Cloud Run allows 10s after SIGTERM
+
+# Document loading
+DOWNLOAD_SPOOL_MAX_BYTES = 32 * 1024 * 1024  # downloads larger than this spill to an unlinked temp file
+PDF_MAX_PAGES = 2000
+PDF_PARALLEL_MIN_PAGES = 40  # smaller PDFs are parsed in the ingest thread, larger ones across the pool
+PDF_INLINE_MAX_BYTES = 5 * 1024 * 1024  # bigger files are never opened in the ingest thread
+PDF_WORKERS = None  # size of the PDF process pool shared by all ingest jobs, None = os.cpu_count()
+PDF_TIMEOUT_SECONDS = 300
+
+# Vector store
+VECTOR_BACKEND = "chroma"  # "chroma" or "numpy" (app/vector_index.py)
+VECTOR_DIM = 768  # gemini-embedding-001 vectors are truncated to this many dims (numpy backend)
+VECTOR_QUANTIZATION = "int8"  # "float32", "float16" or "int8"
+VECTOR_RERANK_OVERSAMPLE = 4  # candidates per result re-scored at full precision
+IVF_MIN_VECTORS = 20000  # below this the numpy backend does exact search
+IVF_NPROBE = 8
+
+# Process summary
+SUMMARY_FETCH_WORKERS = 32  # concurrent GCS reads per summary
+SUMMARY_CACHE_SIZE = 16  # summaries kept, keyed on the process' object generations
+SUMMARY_RESULT_CACHE_SIZE = 20000  # parsed patient results kept, keyed on (blob, generation)
+SUMMARY_MAX_PAGE_SIZE = 500
+
+# Embedding client (set the budgets to the project's gemini-embedding-001 quota)
+EMBED_REQUESTS_PER_MINUTE = 3000
+EMBED_TOKENS_PER_MINUTE = 1_000_000
+EMBED_MAX_BATCH_TOKENS = 20000
+EMBED_MAX_BATCH_SIZE = 100
+EMBED_INITIAL_CONCURRENCY = 2
+EMBED_MAX_CONCURRENCY = 16
+EMBED_LATENCY_TARGET_SECONDS = 5.0  # back off concurrency when batches get slower than this
+EMBED_MAX_RETRIES = 6
+EMBED_BACKOFF_BASE_SECONDS = 1.0
+EMBED_BACKOFF_MAX_SECONDS = 60.0
@@ -0,0 +1,242 @@
+import json
+import math
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from google.cloud import storage
+from pypdf import PdfReader
+import app.config as config
+
+
+def _get_blob(gcs_path: str, bucket_name: str = None):
+    client = storage.Client()
+    return client.bucket(bucket_name or config.BUCKET).blob(gcs_path)
+
+
+# === GCS: STREAMED DOWNLOAD ===
+def download_blob(gcs_path: str, bucket_name: str = None):
+    """
+    Stream a GCS object into a spooled buffer.
+
+    The buffer stays in memory up to DOWNLOAD_SPOOL_MAX_BYTES and then spills to
+    an already-unlinked temp file, so nothing is left on disk once it's closed.
+    Use it as a context manager.
+    """
+    buf = tempfile.SpooledTemporaryFile(max_size=config.DOWNLOAD_SPOOL_MAX_BYTES)
+    try:
+        _get_blob(gcs_path, bucket_name).download_to_file(buf)
+        buf.seek(0)
+    except Exception:
+        buf.close()
+        raise
+    return buf
+
+
+def download_blob_to_file(gcs_path: str, suffix: str = "", bucket_name: str = None):
+    """
+    Stream a GCS object into a named temp file that is deleted on close.
+
+    For readers that need a path, e.g. the PDF pool processes. Use it as a
+    context manager.
+    """
+    tmp = tempfile.NamedTemporaryFile(suffix=suffix)
+    try:
+        _get_blob(gcs_path, bucket_name).download_to_file(tmp)
+        tmp.flush()
+    except Exception:
+        tmp.close()
+        raise
+    return tmp
+
+
+# === PDF: PAGE-LEVEL EXTRACTION ===
+# Small PDFs are parsed in the calling thread: as a single task the pool only
+# adds process round trips. Larger ones go to one pool shared by every ingest
+# job, so concurrent PDFs share PDF_WORKERS processes. Workers open the file by
+# path and enforce the deadline themselves with SIGALRM, which interrupts a
+# stuck page without touching the pool. Only a worker that ignores it gets the
+# pool reset, which fails the other jobs' tasks; those retry once.
+_pool = None
+_pool_lock = threading.Lock()
+_worker_reader = None  # (file key, PdfReader), per pool process
+
+
+def _pool_size() -> int:
+    return config.PDF_WORKERS or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the API process is multi-threaded
+            _pool = ProcessPoolExecutor(_pool_size(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool(pool: ProcessPoolExecutor):
+    """Drop a pool with a wedged or dead worker; the next job gets a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    # ProcessPoolExecutor has no public way to stop a busy worker
+    for p in list((getattr(pool, "_processes", None) or {}).values()):
+        p.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _on_alarm(signum, frame):
+    raise TimeoutError("PDF extraction deadline exceeded")
+
+
+def _run_with_deadline(fn, deadline: float, *args):
+    # deadline is wall-clock time.time() so it means the same in every process
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise TimeoutError("PDF extraction deadline exceeded")
+    previous = signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        return fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _reader(path: str) -> PdfReader:
+    global _worker_reader
+    st = os.stat(path)
+    key = (path, st.st_ino, st.st_mtime_ns)
+    if _worker_reader is None or _worker_reader[0] != key:
+        _worker_reader = (key, PdfReader(path))
+    return _worker_reader[1]
+
+
+def _count_pages(path: str) -> int:
+    return len(_reader(path).pages)
+
+
+def _extract_range(path: str, start: int, end: int) -> list:
+    reader = _reader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def _task_count_pages(path: str, deadline: float) -> int:
+    return _run_with_deadline(_count_pages, deadline, path)
+
+
+def _task_extract_range(path: str, start: int, end: int, deadline: float) -> list:
+    return _run_with_deadline(_extract_range, deadline, path, start, end)
+
+
+def _wait(pool: ProcessPoolExecutor, futures: list, deadline: float) -> list:
+    results = []
+    for f in futures:
+        try:
+            # Workers time out on their own; the margin only covers a wedged process
+            results.append(f.result(timeout=max(deadline - time.time(), 0) + 5))
+        except TimeoutError:
+            for g in futures:
+                g.cancel()
+            if not f.done():
+                _reset_pool(pool)
+            raise TimeoutError(f"PDF extraction exceeded {config.PDF_TIMEOUT_SECONDS}s")
+    return results
+
+
+def _cap_pages(n_pages: int) -> int:
+    if n_pages > config.PDF_MAX_PAGES:
+        print(f"⚠️ PDF has {n_pages} pages, only the first {config.PDF_MAX_PAGES} will be indexed")
+        return config.PDF_MAX_PAGES
+    return n_pages
+
+
+def _extract_inline(reader: PdfReader, n_pages: int, deadline: float) -> str:
+    # SIGALRM only works on the main thread, so the deadline is checked between pages
+    pages = []
+    for i in range(n_pages):
+        if time.time() > deadline:
+            raise TimeoutError(f"PDF extraction exceeded {config.PDF_TIMEOUT_SECONDS}s")
+        pages.append(reader.pages[i].extract_text() or "")
+    return "\n\n".join(pages)
+
+
+def _extract_in_pool(pool: ProcessPoolExecutor, path: str, n_pages: int | None, deadline: float) -> str:
+    if n_pages is None:
+        n_pages = _cap_pages(_wait(pool, [pool.submit(_task_count_pages, path, deadline)], deadline)[0])
+        if n_pages == 0:
+            return ""
+
+    # A few chunks per process keeps the pool busy when page costs are uneven
+    chunk = max(1, math.ceil(n_pages / (_pool_size() * 4)))
+    ranges = [(s, min(s + chunk, n_pages)) for s in range(0, n_pages, chunk)]
+    futures = [pool.submit(_task_extract_range, path, s, e, deadline) for s, e in ranges]
+    chunks = _wait(pool, futures, deadline)
+    return "\n\n".join(page for c in chunks for page in c)
+
+
+def extract_pdf_text(path: str) -> str:
+    """
+    Extract the text of the PDF at `path`, one page per "\\n\\n"-separated block.
+
+    Files up to PDF_INLINE_MAX_BYTES are opened in the calling thread, and
+    parsed there if they have fewer than PDF_PARALLEL_MIN_PAGES pages. Anything
+    else is split into page ranges across the shared process pool. Pages past
+    PDF_MAX_PAGES are dropped. Raises TimeoutError if extraction takes longer
+    than PDF_TIMEOUT_SECONDS; in the calling thread that is only noticed
+    between pages.
+    """
+    deadline = time.time() + config.PDF_TIMEOUT_SECONDS
+
+    n_pages = None
+    if os.path.getsize(path) <= config.PDF_INLINE_MAX_BYTES:
+        reader = PdfReader(path)
+        n_pages = _cap_pages(len(reader.pages))
+        if n_pages < config.PDF_PARALLEL_MIN_PAGES:
+            return _extract_inline(reader, n_pages, deadline)
+
+    for attempt in (1, 2):
+        pool = _get_pool()
+        try:
+            return _extract_in_pool(pool, path, n_pages, deadline)
+        except RuntimeError as e:
+            if isinstance(e, BrokenProcessPool):
+                _reset_pool(pool)
+            elif pool is _pool:
+                raise  # not "cannot schedule new futures after shutdown"
+            if attempt == 2:
+                raise
+            # Another job's timeout (or a crashed worker) took the pool down
+            print(f"⚠️ PDF pool was reset during extraction, retrying: {e}")
+            deadline = time.time() + config.PDF_TIMEOUT_SECONDS
+
+
+# === LOADERS ===
+def load_text_from_gcs(gcs_path: str) -> str:
+    """Download a .pdf or .txt object from the bucket and return its text."""
+    _, ext = os.path.splitext(gcs_path)
+    ext = ext.lower()
+    if ext == ".pdf":
+        with download_blob_to_file(gcs_path, suffix=ext) as tmp:
+            return extract_pdf_text(tmp.name)
+    if ext == ".txt":
+        with download_blob(gcs_path) as buf:
+            return buf.read().decode("utf-8")
+    raise ValueError(f"Unsupported file type: {ext}")
+
+
+def load_json_from_gcs(gcs_path: str) -> dict | list:
+    _, ext = os.path.splitext(gcs_path)
+    ext = ext.lower()
+    if ext != ".json":
+        raise ValueError(f"Unsupported file type for JSON loader: {ext}")
+
+    with download_blob(gcs_path) as buf:
+        return json.load(buf)
@@ -0,0 +1,273 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+import app.config as config
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token; only used for batching and budgeting
+    return max(1, len(text) // 4)
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """True for HTTP 429 / RESOURCE_EXHAUSTED errors, however the SDK wraps them."""
+    code = getattr(e, "code", None)
+    if code is None:
+        code = getattr(e, "status_code", None)
+    if code == 429:
+        return True
+    # Not "quota": 403s about quota projects or billing won't clear on retry
+    msg = str(e).lower()
+    return "429" in msg or "resource_exhausted" in msg or "resource exhausted" in msg
+
+
+class RateLimiter:
+    """
+    Token buckets for a requests-per-period and a tokens-per-period budget.
+
+    `acquire` blocks until both buckets can cover the call. A budget of None
+    means unlimited.
+    """
+
+    def __init__(self, requests_per_period: int = None, tokens_per_period: int = None, period: float = 60.0):
+        self.capacity = {}
+        if requests_per_period:
+            self.capacity["requests"] = float(requests_per_period)
+        if tokens_per_period:
+            self.capacity["tokens"] = float(tokens_per_period)
+        self.level = dict(self.capacity)
+        self.period = period
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        for k, cap in self.capacity.items():
+            self.level[k] = min(cap, self.level[k] + cap * elapsed / self.period)
+
+    def acquire(self, tokens: int):
+        need = {"requests": 1.0, "tokens": float(tokens)}
+        # A single call larger than the whole budget waits for a full bucket
+        need = {k: min(need[k], cap) for k, cap in self.capacity.items()}
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                wait = max(
+                    [(need[k] - self.level[k]) * self.period / self.capacity[k] for k in need],
+                    default=0
+                )
+                if wait <= 0:
+                    for k in need:
+                        self.level[k] -= need[k]
+                    return
+            time.sleep(wait)
+
+
+class AdaptiveEmbeddings(Embeddings):
+    """
+    Rate-limit-aware wrapper around an embeddings provider.
+
+    Texts are packed into batches of at most `max_batch_tokens` estimated
+    tokens / `max_batch_size` texts, and batches run concurrently within the
+    requests/tokens-per-minute budget. Concurrency adapts AIMD-style: +1 after
+    a window of fast successes, -1 when a batch is slower than
+    `latency_target`, halved on a 429, with retries after an exponential
+    backoff with jitter.
+
+    `provider` is anything with embed_documents/embed_query, e.g.
+    GoogleGenerativeAIEmbeddings.
+    """
+
+    def __init__(
+        self,
+        provider,
+        requests_per_minute: int = None,
+        tokens_per_minute: int = None,
+        max_batch_tokens: int = None,
+        max_batch_size: int = None,
+        initial_concurrency: int = None,
+        max_concurrency: int = None,
+        latency_target: float = None,
+        max_retries: int = None,
+        backoff_base: float = None,
+        backoff_max: float = None,
+        period: float = 60.0,
+    ):
+        self.provider = provider
+        self.max_batch_tokens = max_batch_tokens or config.EMBED_MAX_BATCH_TOKENS
+        self.max_batch_size = max_batch_size or config.EMBED_MAX_BATCH_SIZE
+        self.max_concurrency = max_concurrency or config.EMBED_MAX_CONCURRENCY
+        self.latency_target = latency_target or config.EMBED_LATENCY_TARGET_SECONDS
+        self.max_retries = config.EMBED_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or config.EMBED_BACKOFF_BASE_SECONDS
+        self.backoff_max = backoff_max or config.EMBED_BACKOFF_MAX_SECONDS
+        self.limiter = RateLimiter(
+            requests_per_minute or config.EMBED_REQUESTS_PER_MINUTE,
+            tokens_per_minute or config.EMBED_TOKENS_PER_MINUTE,
+            period=period
+        )
+
+        self._cond = threading.Condition()
+        self._limit = min(initial_concurrency or config.EMBED_INITIAL_CONCURRENCY, self.max_concurrency)
+        self._in_flight = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._pool = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="embed")
+        self.stats = {
+            "requests": 0,
+            "texts": 0,
+            "tokens": 0,
+            "rate_limited": 0,
+            "busy_seconds": 0.0,
+        }
+        # Overlapping calls (e.g. several ingest workers) count their wall time once
+        self._active_calls = 0
+        self._busy_since = None
+
+    # === CONCURRENCY ===
+    @property
+    def concurrency(self) -> int:
+        return self._limit
+
+    def _acquire_slot(self):
+        with self._cond:
+            while self._in_flight >= self._limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def _release_slot(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _on_success(self, started: float, latency: float):
+        with self._cond:
+            self.stats["requests"] += 1
+            if latency > self.latency_target:
+                if started >= self._last_decrease:
+                    self._limit = max(1, self._limit - 1)
+                    self._last_decrease = time.monotonic()
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self._limit and self._limit < self.max_concurrency:
+                    self._limit += 1
+                    self._successes = 0
+                    self._cond.notify_all()
+
+    def _on_rate_limited(self, started: float):
+        with self._cond:
+            self.stats["rate_limited"] += 1
+            self._successes = 0
+            # Many in-flight batches hit the same limit; only halve once for them
+            if started >= self._last_decrease:
+                self._limit = max(1, self._limit // 2)
+                self._last_decrease = time.monotonic()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _call(self, fn, tokens: int):
+        attempt = 0
+        while True:
+            self.limiter.acquire(tokens)
+            self._acquire_slot()
+            started = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                self._release_slot()
+                if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                    raise
+                self._on_rate_limited(started)
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            self._release_slot()
+            self._on_success(started, time.monotonic() - started)
+            return result
+
+    # === BATCHING ===
+    def _make_batches(self, texts: list) -> list:
+        batches = []
+        batch, batch_tokens = [], 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= self.max_batch_size):
+                batches.append((batch, batch_tokens))
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append((batch, batch_tokens))
+        return batches
+
+    def _begin_call(self):
+        with self._cond:
+            if self._active_calls == 0:
+                self._busy_since = time.monotonic()
+            self._active_calls += 1
+
+    def _end_call(self, texts: int, tokens: int):
+        with self._cond:
+            self.stats["texts"] += texts
+            self.stats["tokens"] += tokens
+            self._active_calls -= 1
+            if self._active_calls == 0:
+                self.stats["busy_seconds"] += time.monotonic() - self._busy_since
+                self._busy_since = None
+
+    def report(self) -> dict:
+        """
+        Counters since start-up. tokens_per_sec is over the time at least one
+        embed call was running, so it isn't diluted by idle time or inflated
+        by overlapping calls.
+        """
+        with self._cond:
+            stats = dict(self.stats)
+            if self._busy_since is not None:
+                stats["busy_seconds"] += time.monotonic() - self._busy_since
+            stats["concurrency"] = self._limit
+            stats["in_flight"] = self._in_flight
+        stats["tokens_per_sec"] = stats["tokens"] / stats["busy_seconds"] if stats["busy_seconds"] else 0.0
+        return stats
+
+    # === EMBEDDINGS INTERFACE ===
+    def embed_documents(self, texts: list) -> list:
+        if not texts:
+            return []
+        t0 = time.monotonic()
+        batches = self._make_batches(list(texts))
+        tokens = sum(t for _, t in batches)
+        self._begin_call()
+        try:
+            futures = [
+                self._pool.submit(self._call, lambda b=batch: self.provider.embed_documents(b), batch_tokens)
+                for batch, batch_tokens in batches
+            ]
+            vectors = []
+            for f in futures:
+                vectors.extend(f.result())
+        finally:
+            self._end_call(len(texts), tokens)
+
+        elapsed = time.monotonic() - t0
+        if len(batches) > 1:
+            print(
+                f"📈 Embedded {len(texts)} texts in {len(batches)} batches: "
+                f"{tokens / elapsed if elapsed else 0:.0f} tokens/s, concurrency {self._limit}"
+            )
+        return vectors
+
+    def embed_query(self, text: str) -> list:
+        tokens = estimate_tokens(text)
+        self._begin_call()
+        try:
+            return self._call(lambda: self.provider.embed_query(text), tokens)
+        finally:
+            self._end_call(1, tokens)
@@ -154,4 +154,15 @@ def write_or_update_json_to_gcs(blob_name: str, update_data: dict):
         )
 
     except Exception as e:
-        return str(e)
\ No newline at end of file
+        return str(e)
+
+def list_gcs_blobs(prefix: str, bucket_name: str = None) -> list:
+    """
+    List every blob under a prefix of the bucket (recursive).
+
+    Returns the blob objects, so callers get name, generation and size without
+    extra round trips.
+    """
+    client = storage.Client()
+    bucket = client.bucket(bucket_name or config.BUCKET)
+    return list(client.list_blobs(bucket, prefix=prefix))
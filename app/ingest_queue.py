@@ -0,0 +1,276 @@
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+import app.config as config
+from app.vdb_utils import (
+    add_to_vectorstore,
+    add_json_to_vectorstore,
+    push_to_gcs
+)
+
+# === JOB STATES ===
+QUEUED = "queued"
+RUNNING = "running"
+INDEXED = "indexed"  # in the local vector DB, waiting for the next GCS sync
+DONE = "done"
+FAILED = "failed"
+
+# === SINGLETON STATE ===
+_queue = queue.Queue(maxsize=config.INGEST_QUEUE_SIZE)
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+_workers = []
+_workers_lock = threading.Lock()
+# Jobs between get() and INDEXED/FAILED; shutdown waits for them
+_running = 0
+_closed = False
+_dropped = 0
+_running_cond = threading.Condition()
+
+
+class IngestQueueFull(Exception):
+    pass
+
+
+class IngestQueueClosed(Exception):
+    pass
+
+
+def _now():
+    return datetime.now().isoformat()
+
+
+def _update_job(job_id: str, **fields):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            job.update(fields)
+            job["updated_at"] = _now()
+
+
+# === GCS SYNC (debounced) ===
+class DebouncedSync:
+    """
+    Coalesce many sync requests into a single call of `fn`, which must return
+    a truthy value on success.
+
+    `fn` runs once the requests have been quiet for `delay` seconds, or at the
+    latest `max_delay` seconds after the first pending request.
+    """
+
+    def __init__(self, fn, delay: float, max_delay: float, on_synced=None):
+        self.fn = fn
+        self.delay = delay
+        self.max_delay = max_delay
+        self.on_synced = on_synced
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._timer = None
+        self._first_request = None
+
+    def request(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._first_request is None:
+                self._first_request = now
+            wait = min(self.delay, self._first_request + self.max_delay - now)
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(max(wait, 0), self._fire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Run a pending sync now (e.g. on shutdown)."""
+        with self._lock:
+            pending = self._timer is not None
+            if pending:
+                self._timer.cancel()
+        if pending:
+            self._fire()
+        else:
+            # Nothing scheduled, but don't return while a push is mid-upload
+            with self._sync_lock:
+                pass
+
+    def _fire(self):
+        with self._lock:
+            self._timer = None
+            self._first_request = None
+
+        # Only one push at a time; requests made meanwhile schedule a new one
+        with self._sync_lock:
+            started_at = time.monotonic()
+            try:
+                print("🔄 Syncing vector DB to GCS...")
+                ok = self.fn()
+            except Exception as e:
+                print(f"❌ Vector DB sync failed: {e}")
+                ok = False
+
+            if ok:
+                if self.on_synced:
+                    self.on_synced(started_at)
+            else:
+                # Jobs stay "indexed"; try again after the next quiet period
+                print("⚠️ Vector DB sync failed, retrying later")
+                self.request()
+
+
+def _mark_synced(started_at: float):
+    with _jobs_lock:
+        for job in _jobs.values():
+            if job["status"] == INDEXED and job["_indexed_at"] <= started_at:
+                job["status"] = DONE
+                job["updated_at"] = _now()
+
+
+gcs_sync = DebouncedSync(
+    push_to_gcs,
+    delay=config.INGEST_SYNC_DEBOUNCE_SECONDS,
+    max_delay=config.INGEST_SYNC_MAX_DELAY_SECONDS,
+    on_synced=_mark_synced
+)
+
+
+# === WORKERS ===
+def _run_job(kind: str, payload: dict):
+    if kind == "doc":
+        add_to_vectorstore(payload["doc_id"], payload.get("text_content"), payload.get("gcs_path"))
+    elif kind == "json":
+        add_json_to_vectorstore(
+            doc_id=payload["doc_id"],
+            json_obj=payload.get("json_obj"),
+            gcs_path=payload.get("gcs_path")
+        )
+    else:
+        raise ValueError(f"Unknown ingest job kind: {kind}")
+
+
+def _drop_job(job_id: str):
+    global _dropped
+    with _running_cond:
+        _dropped += 1
+    _update_job(job_id, status=FAILED, error="Dropped on shutdown, please resubmit")
+
+
+def _worker_loop():
+    global _running
+    while True:
+        job_id, kind, payload = _queue.get()
+        with _running_cond:
+            closed = _closed
+            if not closed:
+                _running += 1
+        if closed:
+            _drop_job(job_id)
+            _queue.task_done()
+            continue
+        try:
+            _update_job(job_id, status=RUNNING)
+            _run_job(kind, payload)
+            _update_job(job_id, status=INDEXED, _indexed_at=time.monotonic())
+            gcs_sync.request()
+        except Exception as e:
+            traceback.print_exc()
+            _update_job(job_id, status=FAILED, error=str(e))
+        finally:
+            with _running_cond:
+                _running -= 1
+                _running_cond.notify_all()
+            _queue.task_done()
+
+
+def start_workers(n: int = None):
+    """Start the ingestion worker threads (idempotent)."""
+    n = n or config.INGEST_WORKERS
+    with _workers_lock:
+        while len(_workers) < n:
+            t = threading.Thread(target=_worker_loop, name=f"ingest-worker-{len(_workers)}", daemon=True)
+            t.start()
+            _workers.append(t)
+    print(f"🧵 Ingestion workers running: {len(_workers)}")
+
+
+def shutdown(timeout: float = None):
+    """
+    Stop taking jobs, drop the queued ones, wait up to `timeout` seconds for
+    running jobs, then push whatever they indexed to GCS.
+    """
+    global _closed
+    timeout = config.INGEST_SHUTDOWN_TIMEOUT_SECONDS if timeout is None else timeout
+    with _running_cond:
+        _closed = True
+
+    while True:
+        try:
+            job_id, _, _ = _queue.get_nowait()
+        except queue.Empty:
+            break
+        _drop_job(job_id)
+        _queue.task_done()
+
+    with _running_cond:
+        if not _running_cond.wait_for(lambda: _running == 0, timeout):
+            print(f"⚠️ {_running} ingest job(s) still running after {timeout}s, their documents won't be synced")
+        if _dropped:
+            print(f"⚠️ Dropped {_dropped} queued ingest job(s) on shutdown")
+
+    gcs_sync.flush()
+
+
+# === PUBLIC API ===
+def submit_job(kind: str, payload: dict) -> str:
+    """
+    Queue an ingestion job and return its id.
+
+    Raises IngestQueueFull if the queue is at capacity, IngestQueueClosed
+    once shutdown has started.
+    """
+    with _running_cond:
+        if _closed:
+            raise IngestQueueClosed("Ingestion is shutting down")
+
+    job_id = "ingest-" + uuid.uuid4().hex
+    job = {
+        "job_id": job_id,
+        "kind": kind,
+        "doc_id": payload.get("doc_id"),
+        "status": QUEUED,
+        "error": None,
+        "created_at": _now(),
+        "updated_at": _now(),
+        "_indexed_at": None,
+    }
+    with _jobs_lock:
+        _jobs[job_id] = job
+        while len(_jobs) > config.INGEST_JOB_HISTORY:
+            _jobs.popitem(last=False)
+
+    try:
+        _queue.put_nowait((job_id, kind, payload))
+    except queue.Full:
+        with _jobs_lock:
+            _jobs.pop(job_id, None)
+        raise IngestQueueFull(f"Ingestion queue is full ({config.INGEST_QUEUE_SIZE} jobs pending)")
+
+    return job_id
+
+
+def get_job_status(job_id: str) -> dict | None:
+    """
+    Status of a job submitted to this process, or None. The registry is in
+    memory, so other instances don't know the job and a restart forgets it.
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        status = {k: v for k, v in job.items() if not k.startswith("_")}
+    status["queue_size"] = _queue.qsize()
+    return status
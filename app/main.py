@@ -12,20 +12,21 @@ import requests
 from typing import List, Dict, Any
 from pydantic import BaseModel
 import asyncio
-from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Request, HTTPException, BackgroundTasks, Query
 from google.cloud import storage
 import google.auth
 import google.auth.transport.requests
 import threading
 import app.gcs_operation as gcs_operation
 import app.db_ops as db_ops
+import app.config as config
+import app.ingest_queue as ingest_queue
+import app.process_summary as process_summary
 from app.vdb_utils import (
     get_retriever,
-    push_to_gcs,
-    add_to_vectorstore,
     download_from_gcs,
     create_empty_vectorstore,
-    add_json_to_vectorstore
+    get_embeddings
 )
 
 
@@ -91,6 +92,17 @@ async def startup_load_vector_db():
     asyncio.create_task(_background_load())
 
 
+@app.on_event("startup")
+def startup_ingest_workers():
+    ingest_queue.start_workers()
+
+
+@app.on_event("shutdown")
+def shutdown_ingest_queue():
+    """Stop ingestion, let running jobs finish, then push their changes to GCS."""
+    ingest_queue.shutdown()
+
+
 
 @app.get("/load_vector_db/")
 def load_vector_db():
@@ -132,29 +144,46 @@ def query_vector(payload: QueryRequest):
     
     return result
 
-@app.post("/add-doc/")
-def add_document(payload: AddDocRequest):
+def enqueue_ingest(kind: str, payload: AddDocRequest):
     ensure_vectorstore_loaded()
-    add_to_vectorstore(payload.doc_id,payload.text_content , payload.gcs_path)
-    push_to_gcs()
-    return {"status": "added", "id": payload.doc_id}
-
+    try:
+        job_id = ingest_queue.submit_job(kind, payload.model_dump())
+    except (ingest_queue.IngestQueueFull, ingest_queue.IngestQueueClosed) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"status": "queued", "id": payload.doc_id, "job_id": job_id}
 
-@app.post("/add-json/")
+@app.post("/add-doc/", status_code=202)
 def add_document(payload: AddDocRequest):
-    try:
-        ensure_vectorstore_loaded()
-        add_json_to_vectorstore(
-            doc_id = payload.doc_id,
-            json_obj = payload.json_obj , 
-            gcs_path = payload.gcs_path
-            )
-        push_to_gcs()
-        return {"status": "added", "id": payload.doc_id}
-    except:
-        err = traceback.print_exc()
-        return {"status": str(err), "id": payload.doc_id}
-    
+    return enqueue_ingest("doc", payload)
+
+
+@app.post("/add-json/", status_code=202)
+def add_json_document(payload: AddDocRequest):
+    return enqueue_ingest("json", payload)
+
+
+@app.get("/ingest-status/{job_id}")
+def ingest_status(job_id: str):
+    """
+    Progress of a queued /add-doc/ or /add-json/ job:
+    queued -> running -> indexed (waiting for GCS sync) -> done, or failed.
+
+    Jobs are tracked in memory by the instance that accepted them, so query
+    the same instance; other instances and restarts return 404.
+    """
+    status = ingest_queue.get_job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job id: {job_id}")
+    return status
+
+
+@app.get("/embedding-stats")
+def embedding_stats():
+    """
+    Embedding client counters since start-up: requests, texts, tokens, 429s,
+    busy seconds, tokens/sec and the current concurrency limit.
+    """
+    return get_embeddings().report()
 
 
 @app.get("/dummy_patients", response_model=List[Dict])
@@ -248,6 +277,31 @@ def process_drugs(payload: ProcessRequest):
     return data
 
 
+@app.get("/process/{process_id}/summary")
+def get_process_summary(
+    process_id: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=config.SUMMARY_MAX_PAGE_SIZE),
+):
+    """
+    Aggregated outcome of a /process run: patient counts, how many results
+    mention each drug in drug_watch, and one page of per-patient detail.
+    """
+    summary = process_summary.get_process_summary(process_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"Unknown process id: {process_id}")
+
+    patients = summary["patients"]
+    start = (page - 1) * page_size
+    return {
+        **{k: v for k, v in summary.items() if k != "patients"},
+        "page": page,
+        "page_size": page_size,
+        "total_pages": math.ceil(len(patients) / page_size),
+        "patients": patients[start:start + page_size],
+    }
+
+
 def trigger_cloud_run_job(
     project_id: str,
     region: str,
@@ -0,0 +1,204 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from google.cloud import storage
+import app.config as config
+import app.gcs_operation as gcs_operation
+
+# === CACHES ===
+# Summaries are keyed on the (name, generation) of every object under the
+# process prefix, so any new or rewritten patient result invalidates them.
+# Parsed results are keyed on (name, generation) so a rebuild only downloads
+# the objects that changed.
+_summary_cache = OrderedDict()
+_result_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(cache: OrderedDict, key):
+    with _cache_lock:
+        if key not in cache:
+            return None
+        cache.move_to_end(key)
+        return cache[key]
+
+
+def _cache_put(cache: OrderedDict, key, value, max_size: int):
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+
+
+def _fetch_json(bucket, blob) -> dict | list | None:
+    key = (blob.name, blob.generation)
+    cached = _cache_get(_result_cache, key)
+    if cached is not None:
+        return cached
+
+    try:
+        data = json.loads(bucket.blob(blob.name, generation=blob.generation).download_as_text())
+    except Exception as e:
+        print(f"❌ Error reading JSON from gs://{bucket.name}/{blob.name}: {e}")
+        return None
+
+    _cache_put(_result_cache, key, data, config.SUMMARY_RESULT_CACHE_SIZE)
+    return data
+
+
+def _patient_result_blobs(blobs: list, process_id: str) -> dict:
+    """Map patient_id -> blob for process/{process_id}/patients/{patient_id}/{patient_id}.json."""
+    prefix = f"process/{process_id}/patients/"
+    results = {}
+    for blob in blobs:
+        if not blob.name.startswith(prefix):
+            continue
+        parts = blob.name[len(prefix):].split("/")
+        if len(parts) == 2 and parts[1] == f"{parts[0]}.json":
+            results[parts[0]] = blob
+    return results
+
+
+# === DRUG MENTIONS ===
+# The job runner writes free-form results with no per-drug flag, so the summary
+# only reports which watched drugs each result mentions. A mention is not a
+# finding: "warfarin: not prescribed" counts as one.
+# /process copies the patient pool entry (including drug_watch) into the job's
+# input, so results may echo it back; those fields are not mentions.
+ECHOED_KEYS = {"drug_watch", "process_id", "patient_id", "patient_bucket_path"}
+
+
+def _result_texts(node, echoed_keys: set, top: bool = True):
+    """Yield every key and string of a result, minus echoed inputs."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key in ECHOED_KEYS or (top and key in echoed_keys):
+                continue
+            yield str(key)
+            yield from _result_texts(value, echoed_keys, top=False)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _result_texts(value, echoed_keys, top=False)
+    elif isinstance(node, str):
+        yield node
+
+
+def _drug_mentions(result, drug_list: list, echoed_keys: set = frozenset()) -> dict:
+    """
+    drug -> whether the patient's result names it as a whole word, anywhere.
+
+    Top-level keys copied from the patient pool entry (`echoed_keys`) and any
+    echoed drug_watch are ignored.
+    """
+    texts = list(_result_texts(result, echoed_keys))
+    mentions = {}
+    for drug in drug_list:
+        pattern = re.compile(rf"(?<!\w){re.escape(drug)}(?!\w)", re.IGNORECASE)
+        mentions[drug] = any(pattern.search(t) for t in texts)
+    return mentions
+
+
+def _aggregate(process_id: str, pool: list, drug_list: list, result_blobs: dict, fetched: dict) -> dict:
+    pool_by_id = {p["patient_id"]: p for p in pool if isinstance(p, dict) and "patient_id" in p}
+    patient_ids = list(pool_by_id) + sorted(pid for pid in result_blobs if pid not in pool_by_id)
+
+    rows = []
+    mention_rows = []
+    details = []
+    for pid in patient_ids:
+        blob = result_blobs.get(pid)
+        result = fetched.get(blob.name) if blob else None
+        if blob is None:
+            status = "pending"
+        elif result is None:
+            status = "error"
+        else:
+            status = "completed"
+
+        if status == "completed":
+            mentions = _drug_mentions(result, drug_list, set(pool_by_id.get(pid, {})))
+        else:
+            mentions = {d: False for d in drug_list}
+        rows.append({"patient_id": pid, "status": status})
+        mention_rows.append(mentions)
+        details.append({
+            "patient_id": pid,
+            "name": pool_by_id.get(pid, {}).get("name", ""),
+            "status": status,
+            "mentioned_drugs": [d for d, mentioned in mentions.items() if mentioned],
+            "result": result,
+        })
+
+    df = pd.DataFrame(rows, columns=["patient_id", "status"])
+    mentions_df = pd.DataFrame(mention_rows, columns=drug_list, dtype=bool)
+    completed = df["status"] == "completed"
+    n_completed = int(completed.sum())
+
+    status_counts = df["status"].value_counts()
+    drug_counts = mentions_df[completed].sum()
+
+    return {
+        "process_id": process_id,
+        "drug_list": drug_list,
+        "counts": {
+            "patients": len(df),
+            "completed": n_completed,
+            "pending": int(status_counts.get("pending", 0)),
+            "error": int(status_counts.get("error", 0)),
+            "mentioning_any": int(mentions_df[completed].any(axis=1).sum()) if drug_list else 0,
+        },
+        "drug_mentions": {
+            drug: {
+                "patients_mentioning": int(drug_counts[drug]),
+                "rate": float(drug_counts[drug] / n_completed) if n_completed else 0.0,
+            }
+            for drug in drug_list
+        },
+        "patients": details,
+    }
+
+
+def get_process_summary(process_id: str) -> dict | None:
+    """
+    Aggregate the results of a /process run.
+
+    Lists process/{process_id}/ once, downloads the patient pool, drug watch
+    and patient results concurrently, and returns the counts, per-drug mention
+    counts and per-patient details. Returns None if the process has no objects.
+    """
+    prefix = f"process/{process_id}/"
+    blobs = gcs_operation.list_gcs_blobs(prefix)
+    if not blobs:
+        return None
+
+    cache_key = (process_id, tuple(sorted((b.name, b.generation) for b in blobs)))
+    cached = _cache_get(_summary_cache, cache_key)
+    if cached is not None:
+        return cached
+
+    by_name = {b.name: b for b in blobs}
+    pool_blob = by_name.get(f"{prefix}patient_pool.json")
+    watch_blob = by_name.get(f"{prefix}drug_watch.json")
+    result_blobs = _patient_result_blobs(blobs, process_id)
+
+    to_fetch = [b for b in (pool_blob, watch_blob) if b is not None] + list(result_blobs.values())
+    bucket = storage.Client().bucket(config.BUCKET)
+    with ThreadPoolExecutor(max_workers=config.SUMMARY_FETCH_WORKERS) as executor:
+        data = executor.map(lambda b: _fetch_json(bucket, b), to_fetch)
+        fetched = {b.name: d for b, d in zip(to_fetch, data)}
+
+    pool = (fetched.get(pool_blob.name) if pool_blob else None) or []
+    drug_watch = (fetched.get(watch_blob.name) if watch_blob else None) or {}
+
+    # /process accepts duplicates; repeated drugs would become duplicate DataFrame columns
+    drug_list = list(dict.fromkeys(drug_watch.get("drug_list", [])))
+    summary = _aggregate(process_id, pool, drug_list, result_blobs, fetched)
+    # Don't pin failed reads in the cache; the next call retries them
+    if all(d is not None for d in fetched.values()):
+        _cache_put(_summary_cache, cache_key, summary, config.SUMMARY_CACHE_SIZE)
+    return summary
@@ -3,66 +3,153 @@ from langchain_community.embeddings import OpenAIEmbeddings
 from langchain.vectorstores import Chroma
 from langchain.schema import Document
 from google.cloud import storage
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
 import json
 import app.config as config
+from app.doc_loader import load_text_from_gcs, load_json_from_gcs
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from app.embedding_client import AdaptiveEmbeddings
 from dotenv import load_dotenv
 load_dotenv()
 
 # === CONFIG ===
 BUCKET = config.BUCKET
 VECTOR_DB_NAME = "vector_app_db"
-GCS_PATH = f"vector_store/{VECTOR_DB_NAME}"
-VDB_PATH = f"./vector_db/{VECTOR_DB_NAME}/chroma"
+VECTOR_BACKEND = config.VECTOR_BACKEND
+if VECTOR_BACKEND == "numpy":
+    GCS_PATH = f"vector_store/{VECTOR_DB_NAME}_numpy"
+    VDB_PATH = f"./vector_db/{VECTOR_DB_NAME}/numpy"
+else:
+    GCS_PATH = f"vector_store/{VECTOR_DB_NAME}"
+    VDB_PATH = f"./vector_db/{VECTOR_DB_NAME}/chroma"
+NUMPY_INDEX_FILE = os.path.join(VDB_PATH, "index.bin")
 COLLECTION = "cloud_vdb"
-import tempfile
+import threading
+from contextlib import contextmanager
+
+
+class SharedExclusiveLock:
+    """
+    Many holders in shared mode, or one in exclusive mode.
+
+    A waiting exclusive holder blocks new shared holders so it can't starve.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._exclusive_waiting = 0
+
+    @contextmanager
+    def shared(self):
+        with self._cond:
+            while self._exclusive or self._exclusive_waiting:
+                self._cond.wait()
+            self._shared += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._shared -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._cond:
+            self._exclusive_waiting += 1
+            while self._exclusive or self._shared:
+                self._cond.wait()
+            self._exclusive_waiting -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._exclusive = False
+                self._cond.notify_all()
+
+
 # === SINGLETON STATE ===
 _embeddings = None
 _vector_store = None
+_init_lock = threading.Lock()
+# Writes to the local vector DB (embedding included) run side by side in shared
+# mode; downloading or pushing its files to GCS needs exclusive mode
+_store_lock = SharedExclusiveLock()
+# Set by every write, cleared by a successful push. While set, the local DB is
+# ahead of GCS and a download would silently drop those writes.
+_unsynced_changes = False
 
 # === GCS: DOWNLOAD VECTOR STORE ===
 def download_from_gcs():
+    """
+    Replace the local vector DB with the GCS copy. Returns False if there is
+    none. Skipped (returning True) while local writes are waiting to be pushed.
+    """
     try:
         client = storage.Client()
         bucket = client.bucket(BUCKET)
-        blobs = list(bucket.list_blobs(prefix=f"{GCS_PATH}/"))
 
-        if not blobs:
-            print(f"📭 No vector DB found in GCS path: {GCS_PATH}")
-            return False
+        with _store_lock.exclusive():
+            if _unsynced_changes:
+                print("⏭️ Local vector DB has changes not pushed to GCS yet, keeping it")
+                return True
 
-        os.makedirs(VDB_PATH, exist_ok=True)
+            blobs = list(bucket.list_blobs(prefix=f"{GCS_PATH}/"))
+            if not blobs:
+                print(f"📭 No vector DB found in GCS path: {GCS_PATH}")
+                return False
 
-        for blob in blobs:
-            rel_path = blob.name[len(f"{GCS_PATH}/"):]
-            if not rel_path:  # skip prefix directory itself
-                continue
-            dest_path = os.path.join(VDB_PATH, rel_path)
-            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-            print(f"📥 Downloading {blob.name} → {dest_path}")
-            blob.download_to_filename(dest_path)
+            os.makedirs(VDB_PATH, exist_ok=True)
+            _download_blobs(blobs)
 
         return True
     except Exception as e:
         print(f"[download_from_gcs] Error: {e}")
         return False
 
+def _download_blobs(blobs):
+    for blob in blobs:
+        rel_path = blob.name[len(f"{GCS_PATH}/"):]
+        if not rel_path:  # skip prefix directory itself
+            continue
+        dest_path = os.path.join(VDB_PATH, rel_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        print(f"📥 Downloading {blob.name} → {dest_path}")
+        # Replace rather than overwrite in place: the numpy index is memory-mapped
+        blob.download_to_filename(f"{dest_path}.part")
+        os.replace(f"{dest_path}.part", dest_path)
+
+    if VECTOR_BACKEND == "numpy" and _vector_store is not None:
+        _vector_store.load()
+
 # === GCS: PUSH VECTOR STORE ===
-def push_to_gcs():
+def push_to_gcs() -> bool:
+    """Upload the local vector DB to GCS. Returns False if anything failed."""
+    global _unsynced_changes
     try:
         client = storage.Client()
         bucket = client.bucket(BUCKET)
 
-        for root, _, files in os.walk(VDB_PATH):
-            for file in files:
-                full_path = os.path.join(root, file)
-                rel_path = os.path.relpath(full_path, VDB_PATH)
-                blob = bucket.blob(f"{GCS_PATH}/{rel_path}")
-                blob.upload_from_filename(full_path)
-                print(f"📤 Uploaded {rel_path} to GCS")
+        with _store_lock.exclusive():
+            # Persist once per sync rather than per document: the numpy backend
+            # rewrites its whole snapshot file on every persist()
+            if _vector_store is not None:
+                _vector_store.persist()
+            for root, _, files in os.walk(VDB_PATH):
+                for file in files:
+                    if file.endswith((".tmp", ".part")):
+                        continue
+                    full_path = os.path.join(root, file)
+                    rel_path = os.path.relpath(full_path, VDB_PATH)
+                    blob = bucket.blob(f"{GCS_PATH}/{rel_path}")
+                    blob.upload_from_filename(full_path)
+                    print(f"📤 Uploaded {rel_path} to GCS")
+            _unsynced_changes = False
+        return True
     except Exception as e:
         print(f"[push_to_gcs] Error: {e}")
+        return False
 
 # === EMBEDDING INIT (Singleton) ===
 # def get_embeddings():
@@ -77,19 +164,31 @@ def push_to_gcs():
 def get_embeddings():
     global _embeddings
     if _embeddings is None:
-        _embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/gemini-embedding-001",
+        _embeddings = AdaptiveEmbeddings(
+            GoogleGenerativeAIEmbeddings(
+                model="models/gemini-embedding-001",
+            )
         )
     return _embeddings
 # === VECTOR STORE INIT (Singleton) ===
-def get_vector_store():
-    global _vector_store
-    if _vector_store is None:
-        _vector_store = Chroma(
-            collection_name=COLLECTION,
+def _new_vector_store():
+    if VECTOR_BACKEND == "numpy":
+        from app.vector_index import NumpyVectorStore
+        return NumpyVectorStore(
             embedding_function=get_embeddings(),
-            persist_directory=VDB_PATH
+            persist_path=NUMPY_INDEX_FILE
         )
+    return Chroma(
+        collection_name=COLLECTION,
+        embedding_function=get_embeddings(),
+        persist_directory=VDB_PATH
+    )
+
+def get_vector_store():
+    global _vector_store
+    with _init_lock:
+        if _vector_store is None:
+            _vector_store = _new_vector_store()
     return _vector_store
 
 # === RETRIEVER (with optional GCS download trigger) ===
@@ -99,27 +198,9 @@ def get_retriever():
 
 # === ADD DOCUMENT TO VECTOR DB ===
 def add_to_vectorstore(doc_id: str, text: str = None, gcs_path: str = None):
+    global _unsynced_changes
     if text is None and gcs_path:
-        client = storage.Client()
-        bucket = client.bucket(BUCKET)
-        blob = bucket.blob(gcs_path)
-
-        _, ext = os.path.splitext(gcs_path)
-        ext = ext.lower()
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-            blob.download_to_filename(tmp.name)
-            tmp_path = tmp.name
-
-        if ext == ".pdf":
-            loader = PyPDFLoader(tmp_path)
-        elif ext == ".txt":
-            loader = TextLoader(tmp_path, encoding="utf-8")
-        else:
-            raise ValueError(f"Unsupported file type: {ext}")
-
-        docs = loader.load()
-        text = "\n\n".join([doc.page_content for doc in docs])
+        text = load_text_from_gcs(gcs_path)
 
     if not text:
         raise ValueError("No text found for embedding")
@@ -131,45 +212,27 @@ def add_to_vectorstore(doc_id: str, text: str = None, gcs_path: str = None):
 
     vector_store = get_vector_store()
 
-    # 🧼 Optional: delete old version if exists
-    try:
-        vector_store.delete(ids=[doc_id])
-    except Exception as e:
-        print(f"⚠️ Warning: could not delete old doc_id {doc_id}: {e}")
+    with _store_lock.shared():
+        _unsynced_changes = True
+        # 🧼 Optional: delete old version if exists
+        try:
+            vector_store.delete(ids=[doc_id])
+        except Exception as e:
+            print(f"⚠️ Warning: could not delete old doc_id {doc_id}: {e}")
 
-    vector_store.add_documents([doc], ids=[doc_id])  # ✅ assign known ID
-    vector_store.persist()
+        vector_store.add_documents([doc], ids=[doc_id])  # ✅ assign known ID
     print(f"✅ Added doc: {doc_id}")
     
 # === CREATE EMPTY VECTOR STORE LOCALLY ===
 def create_empty_vectorstore():
     os.makedirs(VDB_PATH, exist_ok=True)
-    Chroma(
-        collection_name=COLLECTION,
-        embedding_function=get_embeddings(),
-        persist_directory=VDB_PATH
-    ).persist()
+    _new_vector_store().persist()
     print("📦 Created empty vector store locally")
 
 def add_json_to_vectorstore(doc_id: str, json_obj: dict = None, gcs_path: str = None):
+    global _unsynced_changes
     if json_obj is None and gcs_path:
-        # Load JSON from GCS
-        client = storage.Client()
-        bucket = client.bucket(BUCKET)
-        blob = bucket.blob(gcs_path)
-
-        _, ext = os.path.splitext(gcs_path)
-        ext = ext.lower()
-
-        if ext != ".json":
-            raise ValueError(f"Unsupported file type for JSON loader: {ext}")
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-            blob.download_to_filename(tmp.name)
-            tmp_path = tmp.name
-
-        with open(tmp_path, "r", encoding="utf-8") as f:
-            json_obj = json.load(f)
+        json_obj = load_json_from_gcs(gcs_path)
 
     if not json_obj:
         raise ValueError("No JSON content found for embedding")
@@ -183,6 +246,7 @@ def add_json_to_vectorstore(doc_id: str, json_obj: dict = None, gcs_path: str =
     )
 
     vector_store = get_vector_store()
-    vector_store.add_documents([doc], ids=[doc_id])  # assuming vector DB supports ids
-    vector_store.persist()
+    with _store_lock.shared():
+        _unsynced_changes = True
+        vector_store.add_documents([doc], ids=[doc_id])  # assuming vector DB supports ids
     print(f"✅ Added JSON doc: {doc_id}")
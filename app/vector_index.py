@@ -0,0 +1,360 @@
+import json
+import math
+import os
+import threading
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+import app.config as config
+
+# === SNAPSHOT FORMAT ===
+# One file: MAGIC | uint64 header length | JSON header | arrays (64-byte aligned)
+# The header holds ids/texts/metadata and the offset, dtype and shape of each
+# array, so the matrices can be memory-mapped straight from the snapshot.
+MAGIC = b"NHSVIDX1"
+ALIGN = 64
+SEARCH_BLOCK = 65536  # rows dequantized at a time during a scan
+
+
+def _aligned(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _normalize(v: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(v, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return v / norms
+
+
+def train_ivf(vectors: np.ndarray, nlist: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on (a sample of) unit vectors; returns nlist unit centroids."""
+    rng = np.random.default_rng(seed)
+    n_sample = min(len(vectors), nlist * 256)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), n_sample, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(n_sample, nlist, replace=False)].copy()
+
+    for _ in range(iters):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = np.bincount(assign, minlength=nlist) == 0
+        sums[empty] = centroids[empty]  # keep centroids that lost all members
+        centroids = _normalize(sums)
+    return centroids
+
+
+def assign_ivf(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    out = np.empty(len(vectors), dtype=np.int32)
+    for s in range(0, len(vectors), SEARCH_BLOCK):
+        block = np.asarray(vectors[s:s + SEARCH_BLOCK], dtype=np.float32)
+        out[s:s + SEARCH_BLOCK] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process vector index kept in a single memory-mapped snapshot file.
+
+    Embeddings are truncated to `dim` dimensions and L2-normalised (scores are
+    cosine similarities). Search scans a float16/int8 copy of the matrix, or
+    only the `nprobe` nearest IVF lists once the index holds IVF_MIN_VECTORS
+    vectors, then re-scores the best candidates against the float32 vectors.
+    """
+
+    def __init__(
+        self,
+        embedding_function,
+        persist_path: str,
+        dim: int = None,
+        quantization: str = None,
+        nprobe: int = None,
+    ):
+        self._embedding = embedding_function
+        self.persist_path = persist_path
+        self.dim = dim or config.VECTOR_DIM
+        self.quantization = quantization or config.VECTOR_QUANTIZATION
+        self.nprobe = nprobe or config.IVF_NPROBE
+        if self.quantization not in ("float32", "float16", "int8"):
+            raise ValueError(f"Unsupported quantization: {self.quantization}")
+
+        self._lock = threading.RLock()
+        self._reset()
+        if os.path.exists(persist_path):
+            self.load()
+
+    def _reset(self):
+        self._ids = []
+        self._texts = []
+        self._metadatas = []
+        self._full = np.empty((0, self.dim), dtype=np.float32)
+        self._quant, self._scales = self._quantize(self._full)
+        self._centroids = None
+        self._assign = None
+        self._ivf_trained_on = 0
+        # Rows added since the last search/delete/persist, concatenated lazily so
+        # a run of adds copies the (possibly memory-mapped) matrix only once
+        self._pending = []
+        self._id_set = set()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def __len__(self):
+        return len(self._ids)
+
+    # === VECTORS ===
+    def _reduce(self, vectors) -> np.ndarray:
+        v = np.asarray(vectors, dtype=np.float32)
+        if v.ndim != 2 or v.shape[1] < self.dim:
+            raise ValueError(f"Expected embeddings with at least {self.dim} dims, got shape {v.shape}")
+        return _normalize(v[:, :self.dim])
+
+    def _quantize(self, full: np.ndarray):
+        if self.quantization == "float32":
+            return full, None
+        if self.quantization == "float16":
+            return full.astype(np.float16), None
+        scales = np.abs(full).max(axis=1) / 127
+        scales[scales == 0] = 1
+        quant = np.round(full / scales[:, None]).astype(np.int8)
+        return quant, scales.astype(np.float32)
+
+    def _approx_scores(self, query: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        quant = self._quant if rows is None else self._quant[rows]
+        scores = np.empty(len(quant), dtype=np.float32)
+        for s in range(0, len(quant), SEARCH_BLOCK):
+            scores[s:s + SEARCH_BLOCK] = quant[s:s + SEARCH_BLOCK].astype(np.float32, copy=False) @ query
+        if self._scales is not None:
+            scores *= self._scales if rows is None else self._scales[rows]
+        return scores
+
+    # === ADD / DELETE ===
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs) -> list:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+
+        full = self._reduce(self._embedding.embed_documents(texts))
+        quant, scales = self._quantize(full)
+
+        with self._lock:
+            replaced = [i for i in ids if i in self._id_set]
+            if replaced:
+                self.delete(ids=replaced)
+            self._ids += ids
+            self._id_set.update(ids)
+            self._texts += texts
+            self._metadatas += metadatas
+            assign = assign_ivf(full, self._centroids) if self._centroids is not None else None
+            self._pending.append((full, quant, scales, assign))
+        return ids
+
+    def _flush_pending(self):
+        if not self._pending:
+            return
+        full, quant, scales, assign = zip(*self._pending)
+        self._pending = []
+        self._full = np.concatenate([self._full, *full])
+        self._quant = self._full if self.quantization == "float32" else np.concatenate([self._quant, *quant])
+        if self._scales is not None:
+            self._scales = np.concatenate([self._scales, *scales])
+        if self._assign is not None:
+            self._assign = np.concatenate([self._assign, *assign])
+
+    def add_documents(self, documents: list, ids: list = None, **kwargs) -> list:
+        return self.add_texts(
+            [d.page_content for d in documents],
+            metadatas=[dict(d.metadata) for d in documents],
+            ids=ids,
+        )
+
+    def delete(self, ids: list = None, **kwargs):
+        if not ids:
+            return None
+        with self._lock:
+            drop = set(ids) & self._id_set
+            if not drop:
+                return True
+            self._flush_pending()
+            keep = np.array([i not in drop for i in self._ids], dtype=bool)
+            self._id_set -= drop
+            self._ids = [x for x, k in zip(self._ids, keep) if k]
+            self._texts = [x for x, k in zip(self._texts, keep) if k]
+            self._metadatas = [x for x, k in zip(self._metadatas, keep) if k]
+            self._full = np.asarray(self._full[keep])
+            self._quant = self._full if self.quantization == "float32" else np.asarray(self._quant[keep])
+            if self._scales is not None:
+                self._scales = np.asarray(self._scales[keep])
+            if self._assign is not None:
+                self._assign = np.asarray(self._assign[keep])
+        return True
+
+    # === SEARCH ===
+    def _candidate_rows(self, query: np.ndarray):
+        if self._centroids is None:
+            return None
+        nprobe = min(self.nprobe, len(self._centroids))
+        probe = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        return np.flatnonzero(np.isin(self._assign, probe))
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, **kwargs) -> list:
+        query = self._reduce([embedding])[0]
+        # Rows are only meaningful under the lock: delete() and persist() renumber them
+        with self._lock:
+            self._flush_pending()
+            if not self._ids:
+                return []
+            rows = self._candidate_rows(query)
+            approx = self._approx_scores(query, rows)
+            if len(approx) == 0:
+                return []
+
+            n_cand = min(k * config.VECTOR_RERANK_OVERSAMPLE, len(approx))
+            top = np.argpartition(-approx, n_cand - 1)[:n_cand]
+            # Sorted rows make the memmap gather mostly sequential
+            cand = np.sort(top if rows is None else rows[top])
+            exact = np.asarray(self._full[cand], dtype=np.float32) @ query
+            return [
+                (Document(page_content=self._texts[cand[j]], metadata=self._metadatas[cand[j]]), float(exact[j]))
+                for j in np.argsort(-exact)[:k]
+            ]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs) -> list:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> list:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        # cosine similarity in [-1, 1] -> [0, 1]
+        return lambda score: (score + 1) / 2
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, persist_path: str = None, **kwargs):
+        store = cls(embedding, persist_path, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    # === SNAPSHOT ===
+    def _arrays(self) -> dict:
+        arrays = {"full": self._full}
+        if self.quantization != "float32":
+            arrays["quant"] = self._quant
+        if self._scales is not None:
+            arrays["scales"] = self._scales
+        if self._centroids is not None:
+            arrays["centroids"] = self._centroids
+            arrays["assign"] = self._assign
+        return arrays
+
+    def _maybe_train_ivf(self):
+        self._flush_pending()
+        n = len(self._ids)
+        if n < config.IVF_MIN_VECTORS:
+            self._centroids = self._assign = None
+            self._ivf_trained_on = 0
+            return
+        # Retrain when the index has doubled since the centroids were fitted
+        if self._centroids is None or n > 2 * self._ivf_trained_on:
+            self._centroids = train_ivf(self._full, int(math.sqrt(n)))
+            self._assign = assign_ivf(self._full, self._centroids)
+            self._ivf_trained_on = n
+
+        # Store each IVF list contiguously so a probe reads a few runs of pages
+        order = np.argsort(self._assign, kind="stable")
+        if np.any(order != np.arange(n)):
+            self._ids = [self._ids[i] for i in order]
+            self._texts = [self._texts[i] for i in order]
+            self._metadatas = [self._metadatas[i] for i in order]
+            self._full = np.asarray(self._full[order])
+            self._quant = self._full if self.quantization == "float32" else np.asarray(self._quant[order])
+            if self._scales is not None:
+                self._scales = np.asarray(self._scales[order])
+            self._assign = np.asarray(self._assign[order])
+
+    def persist(self):
+        """
+        Write the index to `persist_path` atomically and re-open it memory-mapped.
+
+        This rewrites the whole snapshot, so callers should batch it (the app
+        persists once per debounced GCS sync, not per document).
+        """
+        with self._lock:
+            self._maybe_train_ivf()
+            arrays = self._arrays()
+
+            header = {
+                "dim": self.dim,
+                "quantization": self.quantization,
+                "ivf_trained_on": self._ivf_trained_on,
+                "ids": self._ids,
+                "texts": self._texts,
+                "metadatas": self._metadatas,
+                "arrays": {},
+            }
+            offset = 0
+            for name, arr in arrays.items():
+                header["arrays"][name] = {"offset": offset, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+                offset = _aligned(offset + arr.nbytes)
+            header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+            data_start = _aligned(len(MAGIC) + 8 + len(header_bytes))
+
+            os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(MAGIC)
+                f.write(len(header_bytes).to_bytes(8, "little"))
+                f.write(header_bytes)
+                for name, arr in arrays.items():
+                    f.seek(data_start + header["arrays"][name]["offset"])
+                    f.write(np.ascontiguousarray(arr).tobytes())
+                f.truncate(data_start + offset)
+            os.replace(tmp_path, self.persist_path)
+            self.load()
+
+    def load(self):
+        """(Re)open the snapshot at `persist_path`, memory-mapping its matrices."""
+        with self._lock:
+            with open(self.persist_path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"Not a vector index snapshot: {self.persist_path}")
+                header_len = int.from_bytes(f.read(8), "little")
+                header = json.loads(f.read(header_len).decode("utf-8"))
+            data_start = _aligned(len(MAGIC) + 8 + header_len)
+
+            if header["dim"] != self.dim or header["quantization"] != self.quantization:
+                raise ValueError(
+                    f"Snapshot is {header['dim']}d/{header['quantization']}, "
+                    f"store is configured for {self.dim}d/{self.quantization}"
+                )
+
+            arrays = {}
+            for name, spec in header["arrays"].items():
+                shape = tuple(spec["shape"])
+                if math.prod(shape) == 0:
+                    arrays[name] = np.empty(shape, dtype=spec["dtype"])
+                else:
+                    arrays[name] = np.memmap(
+                        self.persist_path, dtype=spec["dtype"], mode="r",
+                        offset=data_start + spec["offset"], shape=shape
+                    )
+
+            self._reset()
+            self._ids = header["ids"]
+            self._id_set = set(self._ids)
+            self._texts = header["texts"]
+            self._metadatas = header["metadatas"]
+            self._ivf_trained_on = header["ivf_trained_on"]
+            self._full = arrays["full"]
+            self._quant = arrays.get("quant", self._full)
+            self._scales = arrays.get("scales")
+            self._centroids = arrays.get("centroids")
+            self._assign = arrays.get("assign")
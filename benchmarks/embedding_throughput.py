@@ -0,0 +1,123 @@
+"""
+Measure AdaptiveEmbeddings against a local fake provider that enforces quotas.
+
+The fake provider behaves like GoogleGenerativeAIEmbeddings: embed_documents
+sends the texts in sequential requests of up to 100, each answering after a
+latency proportional to its size, and a request gets a 429 once a sliding
+window's request or token quota is used up. The baseline is that provider's
+own embed_documents over the whole corpus (retrying a rejected request after a
+short wait); the second run sends the same corpus through AdaptiveEmbeddings.
+Both print tokens/sec and the 429 count.
+
+    python -m benchmarks.embedding_throughput --texts 5000 --window 2
+"""
+import argparse
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from app.embedding_client import AdaptiveEmbeddings, estimate_tokens
+
+
+class QuotaExceeded(Exception):
+    code = 429
+
+
+class FakeEmbeddingProvider:
+    """In-process stand-in for the embeddings API with rpm/tpm quotas per `window` seconds."""
+
+    def __init__(self, rpm: int, tpm: int, window: float = 60.0, dim: int = 3072,
+                 base_latency: float = 0.05, latency_per_1k_tokens: float = 0.01,
+                 batch_size: int = 100, retry_wait: float = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self.dim = dim
+        self.base_latency = base_latency
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.batch_size = batch_size
+        # None raises the 429 to the caller; otherwise wait and resend the request
+        self.retry_wait = retry_wait
+        self._calls = deque()  # (time, tokens)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _admit(self, tokens: int):
+        with self._lock:
+            now = time.monotonic()
+            while self._calls and self._calls[0][0] < now - self.window:
+                self._calls.popleft()
+            used = sum(t for _, t in self._calls)
+            if len(self._calls) + 1 > self.rpm or used + tokens > self.tpm:
+                self.rejected += 1
+                raise QuotaExceeded("429 RESOURCE_EXHAUSTED: quota exceeded")
+            self._calls.append((now, tokens))
+
+    def _request(self, texts: list) -> list:
+        tokens = sum(estimate_tokens(t) for t in texts)
+        while True:
+            try:
+                self._admit(tokens)
+                break
+            except QuotaExceeded:
+                if self.retry_wait is None:
+                    raise
+                time.sleep(self.retry_wait)
+        time.sleep(self.base_latency + self.latency_per_1k_tokens * tokens / 1000)
+        rng = np.random.default_rng(abs(hash(texts[0])) % 2**32)
+        return rng.normal(size=(len(texts), self.dim)).tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._request(texts[i:i + self.batch_size]))
+        return vectors
+
+    def embed_query(self, text: str) -> list:
+        return self.embed_documents([text])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--chars", type=int, default=2000, help="characters per text")
+    parser.add_argument("--rpm", type=int, default=300, help="fake quota: requests per window")
+    parser.add_argument("--tpm", type=int, default=400000, help="fake quota: tokens per window")
+    parser.add_argument("--window", type=float, default=2.0, help="quota window in seconds (60 for real time)")
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    texts = [f"{i} " + "x" * args.chars for i in range(args.texts)]
+    total_tokens = sum(estimate_tokens(t) for t in texts)
+
+    if not args.skip_baseline:
+        provider = FakeEmbeddingProvider(args.rpm, args.tpm, window=args.window, retry_wait=args.window / 10)
+        t0 = time.monotonic()
+        vectors = provider.embed_documents(texts)
+        elapsed = time.monotonic() - t0
+        assert len(vectors) == len(texts)
+        print(f"provider: {total_tokens / elapsed:>10.0f} tokens/s, 429s {provider.rejected}")
+
+    provider = FakeEmbeddingProvider(args.rpm, args.tpm, window=args.window)
+    client = AdaptiveEmbeddings(
+        provider,
+        # budget a little under the quota, as in production
+        requests_per_minute=int(args.rpm * 0.9),
+        tokens_per_minute=int(args.tpm * 0.9),
+        period=args.window,
+        backoff_base=args.window / 20,
+        backoff_max=args.window,
+    )
+    vectors = client.embed_documents(texts)
+    assert len(vectors) == len(texts)
+    report = client.report()
+    print(
+        f"adaptive: {report['tokens_per_sec']:>10.0f} tokens/s, 429s {provider.rejected}, "
+        f"requests {report['requests']}, concurrency {report['concurrency']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
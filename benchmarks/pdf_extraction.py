@@ -0,0 +1,109 @@
+"""
+Compare single-process PDF text extraction with the pooled extract_pdf_text.
+
+Pass a real PDF, or let the script write a synthetic text PDF with --pages
+pages. The baseline is what ingestion did before: one pypdf reader walking
+every page in the calling thread. Every timed run reads a fresh copy of the
+file, so the pool workers' cached reader doesn't flatter repeats.
+
+    python -m benchmarks.pdf_extraction --pages 400 --workers 8
+    python -m benchmarks.pdf_extraction --pdf some_report.pdf
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from pypdf import PdfReader
+
+import app.config as config
+import app.doc_loader as doc_loader
+
+
+def write_synthetic_pdf(path: str, pages: int, lines_per_page: int = 60):
+    """Minimal PDF with `pages` pages of Helvetica text."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for p in range(pages):
+        lines = [
+            f"({'Page %d line %d: patient observation, dosage and follow-up notes.' % (p, i)}) Tj 0 -12 Td"
+            for i in range(lines_per_page)
+        ]
+        stream = ("BT /F1 9 Tf 40 780 Td " + " ".join(lines) + " ET").encode()
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for i, obj in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % i + obj + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for off in offsets:
+            f.write(b"%010d 00000 n \n" % off)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def baseline(path: str) -> str:
+    reader = PdfReader(path)
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF to parse (default: a synthetic one)")
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=None, help="PDF_WORKERS (default: os.cpu_count())")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    config.PDF_WORKERS = args.workers
+    path = args.pdf
+    tmp_dir = None
+    if path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp_dir.name, "synthetic.pdf")
+        write_synthetic_pdf(path, args.pages)
+
+    try:
+        # Warm the pool so process start-up isn't billed to the first run
+        doc_loader.extract_pdf_text(path)
+
+        results = {}
+        copy_dir = tempfile.TemporaryDirectory()
+        for name, fn in (("single process", baseline), ("extract_pdf_text", doc_loader.extract_pdf_text)):
+            times = []
+            for i in range(args.repeat):
+                run_path = shutil.copy(path, os.path.join(copy_dir.name, f"{name.replace(' ', '_')}-{i}.pdf"))
+                t0 = time.perf_counter()
+                text = fn(run_path)
+                times.append(time.perf_counter() - t0)
+            results[name] = (min(times), len(text))
+        copy_dir.cleanup()
+
+        n_pages = len(PdfReader(path).pages)
+        print(f"{n_pages} pages, {doc_loader._pool_size()} pool workers, {os.cpu_count()} CPUs")
+        for name, (best, chars) in results.items():
+            print(f"{name:>16}: {best:7.2f}s  ({chars} chars)")
+        print(f"{'speed-up':>16}: {results['single process'][0] / results['extract_pdf_text'][0]:7.2f}x")
+    finally:
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
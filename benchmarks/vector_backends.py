@@ -0,0 +1,165 @@
+"""
+Compare the Chroma and numpy vector backends on recall, latency and memory.
+
+Uses synthetic clustered 3072-d vectors (the full gemini-embedding-001 size)
+behind a fake embedding function, so no API calls are made. Recall@k is
+measured against exact cosine search on the full-dimension vectors;
+heap_mb is the anonymous memory gained by reopening the snapshot and
+running the queries. build_s adds the corpus in 5000-text batches and persists
+once, as the app does: it persists once per debounced GCS sync, never per
+document (a numpy persist rewrites the whole snapshot).
+
+    python -m benchmarks.vector_backends --n 50000 --queries 200
+"""
+import argparse
+import gc
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import app.config as config
+from app.vector_index import NumpyVectorStore
+
+FULL_DIM = 3072
+
+
+class FakeEmbeddings:
+    """Look up precomputed vectors by text ("doc-<i>" / "query-<i>")."""
+
+    def __init__(self, docs: np.ndarray, queries: np.ndarray):
+        self.docs = docs
+        self.queries = queries
+
+    def _lookup(self, text: str) -> list:
+        kind, i = text.split("-")
+        return (self.docs if kind == "doc" else self.queries)[int(i)].tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        return [self._lookup(t) for t in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._lookup(text)
+
+
+def make_data(n: int, n_queries: int, clusters: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, FULL_DIM)).astype(np.float32)
+    docs = centers[rng.integers(0, clusters, n)] + 0.6 * rng.normal(size=(n, FULL_DIM)).astype(np.float32)
+    queries = docs[rng.integers(0, n, n_queries)] + 0.3 * rng.normal(size=(n_queries, FULL_DIM)).astype(np.float32)
+    # Matryoshka-style embeddings put most of the signal in the leading dims,
+    # which is what makes truncating to VECTOR_DIM viable
+    decay = np.exp(-np.arange(FULL_DIM) / 768).astype(np.float32)
+    docs *= decay
+    queries *= decay
+    docs /= np.linalg.norm(docs, axis=1, keepdims=True)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return docs, queries
+
+
+def ground_truth(docs: np.ndarray, queries: np.ndarray, k: int) -> list:
+    scores = queries @ docs.T
+    return [set(np.argsort(-row)[:k]) for row in scores]
+
+
+def anon_rss_bytes() -> int:
+    # Anonymous (heap) pages only: memory-mapped snapshot pages are page cache
+    # the kernel can reclaim, so they are reported as disk_mb instead
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def dir_stats(path: str):
+    files = [os.path.join(r, f) for r, _, fs in os.walk(path) for f in fs]
+    return len(files), sum(os.path.getsize(f) for f in files)
+
+
+def run_backend(name, build, n, queries, truth, k, workdir):
+    t0 = time.perf_counter()
+    store = build(workdir)
+    ids = [f"{i}" for i in range(n)]
+    texts = [f"doc-{i}" for i in range(n)]
+    for s in range(0, n, 5000):
+        store.add_texts(texts[s:s + 5000], metadatas=[{"i": i} for i in range(s, min(s + 5000, n))], ids=ids[s:s + 5000])
+    store.persist()
+    build_s = time.perf_counter() - t0
+
+    # Cold start: reopen from the snapshot
+    del store
+    gc.collect()
+    rss_before = anon_rss_bytes()
+    t0 = time.perf_counter()
+    store = build(workdir)
+    open_s = time.perf_counter() - t0
+
+    latencies = []
+    hits = 0
+    for qi in range(len(queries)):
+        t0 = time.perf_counter()
+        docs = store.similarity_search(f"query-{qi}", k=k)
+        latencies.append(time.perf_counter() - t0)
+        hits += len({d.metadata["i"] for d in docs} & truth[qi])
+
+    n_files, disk = dir_stats(workdir)
+    lat = np.array(latencies) * 1000
+    return {
+        "backend": name,
+        f"recall@{k}": hits / (k * len(queries)),
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "build_s": build_s,
+        "open_s": open_s,
+        "heap_mb": (anon_rss_bytes() - rss_before) / 2**20,
+        "disk_mb": disk / 2**20,
+        "files": n_files,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=config.VECTOR_DIM)
+    parser.add_argument("--skip-chroma", action="store_true")
+    args = parser.parse_args()
+
+    docs, queries = make_data(args.n, args.queries, args.clusters)
+    truth = ground_truth(docs, queries, args.k)
+    embeddings = FakeEmbeddings(docs, queries)
+
+    backends = []
+    if not args.skip_chroma:
+        from langchain.vectorstores import Chroma
+
+        backends.append(("chroma", lambda d: Chroma(
+            collection_name="bench", embedding_function=embeddings, persist_directory=d
+        )))
+    for q in ("float32", "float16", "int8"):
+        backends.append((f"numpy-{args.dim}d-{q}", lambda d, q=q: NumpyVectorStore(
+            embeddings, os.path.join(d, "index.bin"), dim=args.dim, quantization=q
+        )))
+
+    results = []
+    for name, build in backends:
+        workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+        try:
+            print(f"⏱️ {name} ...")
+            results.append(run_backend(name, build, args.n, queries, truth, args.k, workdir))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    cols = list(results[0].keys())
+    print(" | ".join(f"{c:>16}" for c in cols))
+    for r in results:
+        print(" | ".join(f"{r[c]:>16.3f}" if isinstance(r[c], float) else f"{r[c]:>16}" for c in cols))
+
+
+if __name__ == "__main__":
+    main()